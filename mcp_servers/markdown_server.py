@@ -1,6 +1,7 @@
 """Markdown 文件读写 MCP 服务器"""
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from mcp.server.fastmcp import FastMCP
@@ -9,6 +10,11 @@ from mcp.server.fastmcp import FastMCP
 mcp = FastMCP("Markdown Reader and Writer")
 
 
+def _read_one(entry: os.DirEntry) -> str:
+    """读取单个 Markdown 文件并加上文件名标题"""
+    return f"=== {entry.name} ===\n{Path(entry.path).read_text(encoding='utf-8')}"
+
+
 @mcp.tool()
 def read_markdown_file(directory_path: str) -> str:
     """Read markdown files from a directory.
@@ -20,20 +26,22 @@ def read_markdown_file(directory_path: str) -> str:
         The content of the markdown file as a string, or an error message
         if the file doesn't exist.
     """
-    # 获取所有 .md 文件
-    file_paths = list(Path(directory_path).glob("*.md"))
+    # 获取所有 .md 文件（scandir 直接返回文件类型，无需逐个 stat；
+    # 扩展名不区分大小写，与 Windows 上 Path.glob 的行为一致）
+    try:
+        with os.scandir(directory_path) as it:
+            entries = [e for e in it if e.is_file() and e.name.lower().endswith(".md")]
+    except OSError:
+        entries = []
     
     # 检查是否找到文件
-    if not file_paths:
+    if not entries:
         return f"错误: 在 {directory_path} 中没有找到 Markdown 文件"
     
-    # 读取并返回文件内容
+    # 并发读取并返回文件内容
     try:
-        markdown_contents = []
-        for file_path in file_paths:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-                markdown_contents.append(f"=== {file_path.name} ===\n{content}")
+        with ThreadPoolExecutor(max_workers=min(32, len(entries))) as executor:
+            markdown_contents = list(executor.map(_read_one, entries))
         
         return "\n\n".join(markdown_contents)
     except Exception as e:
@@ -64,18 +72,16 @@ def write_markdown_file(directory_path: str, filename: str, content: str) -> str
     # 确保目录存在
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
     
-    # 检查文件是否已存在
-    if file_path.exists():
+    # 以独占模式写入文件内容，存在检查与创建在同一次 open 中完成
+    try:
+        with file_path.open("x", encoding="utf-8") as f:
+            f.write(content)
+        return f"成功: Markdown 文件已保存到 {file_path}"
+    except FileExistsError:
         return (
             f"错误: 文件 {file_path} 已存在，"
             "操作已取消以防止意外覆盖"
         )
-    
-    # 写入文件内容
-    try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(content)
-        return f"成功: Markdown 文件已保存到 {file_path}"
     except Exception as e:
         return f"写入文件时出错: {str(e)}"
 
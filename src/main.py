@@ -5,6 +5,11 @@ import logging
 import sys
 import os
 
+try:
+    import uvloop
+except ImportError:  # uvloop 不支持 Windows，回退到默认事件循环
+    uvloop = None
+
 # 添加当前目录到路径
 sys.path.insert(0, os.path.dirname(__file__))
 
@@ -21,12 +26,13 @@ async def main() -> None:
     llm_provider = os.getenv("LLM_PROVIDER", "ollama")
     
     if llm_provider == "siliconflow":
-        llm_client = SiliconFlowClient()
+        llm_client = SiliconFlowClient(temperature=config.llm_temperature)
         print(f"使用硅基流动模型: {llm_client.model_name}")
     else:
         llm_client = OllamaClient(
             model_name=config.ollama_model_name,
             api_base=config.ollama_base_url,
+            temperature=config.llm_temperature,
         )
         print(f"使用 Ollama 模型: {llm_client.model_name}")
     
@@ -84,11 +90,10 @@ async def main() -> None:
                 if not user_input:
                     continue
                 
-                # 处理消息并获取响应
-                response = await chat_session.send_message(user_input)
-                
-                # 显示响应
-                print(f"\nAssistant: {response}\n")
+                # 处理消息，响应会以流式输出
+                print("\nAssistant: ", end="", flush=True)
+                await chat_session.send_message(user_input)
+                print()
                 
             except KeyboardInterrupt:
                 print("\n\n再见！")
@@ -96,7 +101,11 @@ async def main() -> None:
     finally:
         # 清理资源
         await chat_session.cleanup_clients()
+        await llm_client.aclose()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
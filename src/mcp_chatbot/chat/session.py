@@ -1,17 +1,25 @@
 """聊天会话管理"""
 
-import json
+import asyncio
+import io
 import logging
 import re
+import sys
+from contextlib import aclosing
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 
+import orjson
+
+from ..llm.cache import ResponseCache
 from ..llm.ollama import OllamaClient
-from ..mcp import MCPClient
+from ..mcp import MCPClient, MCPTool
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
+# httpx 会为每个请求输出一条 INFO 日志，干扰流式输出
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
 SYSTEM_MESSAGE = (
     "You are a helpful assistant with access to these tools:\n\n"
@@ -36,6 +44,320 @@ SYSTEM_MESSAGE = (
     "Please use only the tools that are explicitly defined above."
 )
 
+# 预先拆分系统消息模板，避免每次创建会话时重新解析格式串
+_SYSTEM_MESSAGE_PREFIX, _SYSTEM_MESSAGE_SUFFIX = (
+    part.replace("{{", "{").replace("}}", "}")
+    for part in SYSTEM_MESSAGE.split("{tools_description}", 1)
+)
+
+
+def _parse_tool_call(candidate: str) -> Optional[Dict[str, Any]]:
+    """将候选子串解析为工具调用
+
+    Args:
+        candidate: JSON 对象候选子串
+
+    Returns:
+        工具调用数据，不是合法的工具调用时为 None
+    """
+    try:
+        json_obj = orjson.loads(candidate)
+    except orjson.JSONDecodeError:
+        return None
+    if isinstance(json_obj, dict) and "tool" in json_obj and "arguments" in json_obj:
+        return json_obj
+    return None
+
+
+# _ObjectParse 中每层容器期望的下一个记号
+_KEY_OR_END = 0  # "{" 之后：键或 "}"
+_KEY = 1  # 对象中 "," 之后：键
+_COLON = 2  # 键之后：":"
+_VALUE = 3  # ":" 或数组中 "," 之后：值
+_VALUE_OR_END = 4  # "[" 之后：值或 "]"
+_COMMA_OR_END = 5  # 值之后："," 或闭合括号
+
+# _ObjectParse.step 的返回值
+_OPEN = 0
+_CLOSED = 1
+_FAILED = 2
+
+_WHITESPACE = frozenset(" \t\r\n")
+_SCALAR_START = frozenset("-0123456789tfn")
+_SCALAR_CHARS = frozenset(
+    "+-.0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+)
+_SCALAR_PATTERN = re.compile(
+    r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?|true|false|null"
+)
+
+# (起始位置, 结束位置, 工具调用数据)
+_Span = Tuple[int, int, Dict[str, Any]]
+
+
+class _ObjectParse:
+    """从某个 "{" 开始逐字符解析 JSON 对象
+
+    只跟踪语法结构：容器栈、字符串、转义和标量。每层对象记录是否同时含有
+    "tool" 和 "arguments" 键，只有这样的对象闭合时才交给 orjson 解析。
+    嵌套的 "{" 与从它单独开始的解析完全一致，因此不需要另开解析。
+    """
+
+    def __init__(self, scanner: "_ToolCallScanner", root: int) -> None:
+        self.root = root
+        self.in_string = False
+        # 已闭合、且不在其他已记录工具调用内部的工具调用，按起始位置排序
+        self.tool_calls: List[_Span] = []
+        self._scanner = scanner
+        # 每层为 [是否对象, 起始位置, 期望记号, 含 tool 键, 含 arguments 键]
+        self._stack: List[List[Any]] = [[True, root, _KEY_OR_END, False, False]]
+        self._escape = False
+        self._key_start = -1
+        self._scalar_start = -1
+
+    def step(self, char: str, pos: int) -> int:
+        """解析一个字符
+
+        Args:
+            char: 字符
+            pos: 字符在整段输入中的位置
+
+        Returns:
+            _OPEN、_CLOSED（最外层对象闭合）或 _FAILED（不是合法的 JSON）
+        """
+        frame = self._stack[-1]
+        if self.in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self.in_string = False
+                if self._key_start < 0:
+                    frame[2] = _COMMA_OR_END
+                else:
+                    key = self._scanner.slice(self._key_start, pos)
+                    if key == "tool":
+                        frame[3] = True
+                    elif key == "arguments":
+                        frame[4] = True
+                    self._key_start = -1
+                    frame[2] = _COLON
+            return _OPEN
+
+        if self._scalar_start >= 0:
+            if char in _SCALAR_CHARS:
+                return _OPEN
+            scalar = self._scanner.slice(self._scalar_start, pos)
+            if not _SCALAR_PATTERN.fullmatch(scalar):
+                return _FAILED
+            self._scalar_start = -1
+
+        if char in _WHITESPACE:
+            return _OPEN
+        state = frame[2]
+        if char == '"':
+            if state == _KEY_OR_END or state == _KEY:
+                self._key_start = pos + 1
+            elif state != _VALUE and state != _VALUE_OR_END:
+                return _FAILED
+            self.in_string = True
+        elif char == "{" or char == "[":
+            if state != _VALUE and state != _VALUE_OR_END:
+                return _FAILED
+            is_object = char == "{"
+            self._stack.append(
+                [is_object, pos, _KEY_OR_END if is_object else _VALUE_OR_END, False, False]
+            )
+        elif char == "}" or char == "]":
+            if frame[0] != (char == "}"):
+                return _FAILED
+            if state != _COMMA_OR_END and state != (
+                _KEY_OR_END if frame[0] else _VALUE_OR_END
+            ):
+                return _FAILED
+            return self._close(frame, pos + 1)
+        elif char == ",":
+            if state != _COMMA_OR_END:
+                return _FAILED
+            frame[2] = _KEY if frame[0] else _VALUE
+        elif char == ":":
+            if state != _COLON:
+                return _FAILED
+            frame[2] = _VALUE
+        elif char in _SCALAR_START and (state == _VALUE or state == _VALUE_OR_END):
+            self._scalar_start = pos
+            frame[2] = _COMMA_OR_END
+        else:
+            return _FAILED
+        return _OPEN
+
+    def _close(self, frame: List[Any], end: int) -> int:
+        """闭合栈顶容器，是工具调用时记录下来"""
+        self._stack.pop()
+        if frame[3] and frame[4]:
+            tool_call = _parse_tool_call(self._scanner.slice(frame[1], end))
+            if tool_call is not None:
+                # 新的工具调用包含此前记录的内层工具调用
+                while self.tool_calls and self.tool_calls[-1][0] > frame[1]:
+                    self.tool_calls.pop()
+                self.tool_calls.append((frame[1], end, tool_call))
+        if not self._stack:
+            return _CLOSED
+        self._stack[-1][2] = _COMMA_OR_END
+        return _OPEN
+
+    def drop_before(self, end: int) -> Tuple[bool, List[_Span]]:
+        """丢弃起始位置在 end 之前的容器，以剩下的最外层对象作为新的起点
+
+        Args:
+            end: 已输出的工具调用的结束位置
+
+        Returns:
+            是否还有未闭合的对象，以及不再被未闭合对象包含的工具调用
+        """
+        stack = self._stack
+        index = 0
+        while index < len(stack) and (stack[index][1] < end or not stack[index][0]):
+            index += 1
+        self._stack = stack[index:]
+        if not self._stack:
+            return False, [span for span in self.tool_calls if span[0] >= end]
+        self.root = self._stack[0][1]
+        released = [span for span in self.tool_calls if end <= span[0] < self.root]
+        self.tool_calls = [span for span in self.tool_calls if span[0] > self.root]
+        return True, released
+
+
+class _ToolCallScanner:
+    """增量扫描文本中的工具调用 JSON 对象
+
+    文本可以分块传入，每个字符只被常数个解析处理，总耗时与文本长度成线性。
+    每个 "{" 要么作为已有解析中的嵌套对象，要么（在已有解析看来位于字符串内）
+    开始一个新的解析；同一时刻只有引号奇偶不同的少数几个解析。不是合法 JSON
+    或不是工具调用的对象被视为普通文本，其中已闭合的工具调用仍会被找到。
+    工具调用按出现顺序输出，且不与已输出的工具调用重叠。
+    """
+
+    def __init__(self) -> None:
+        self._text: str = ""
+        self._offset: int = 0  # self._text[0] 在整段输入中的位置
+        self._pos: int = 0  # 下一个待扫描字符的位置
+        self._parses: List[_ObjectParse] = []  # 未闭合的解析，按起点排序
+        self._pending: List[_Span] = []  # 已确定、等待更早的解析结束的工具调用
+        self._end: int = 0  # 上一个已输出的工具调用的结束位置
+
+    def slice(self, start: int, end: int) -> str:
+        """按整段输入中的位置截取文本"""
+        return self._text[start - self._offset : end - self._offset]
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """扫描一段文本
+
+        Args:
+            text: 待扫描的文本片段
+
+        Returns:
+            已经可以确定的工具调用
+        """
+        self._text += text
+        buffer = self._text
+        offset = self._offset
+        end = offset + len(buffer)
+        pos = self._pos
+        tool_calls = []
+
+        while pos < end:
+            parses = self._parses
+            if not parses:
+                # 对象之外的正文只需要查找下一个 "{"
+                index = buffer.find("{", pos - offset)
+                if index < 0:
+                    pos = end
+                    break
+                pos = offset + index
+            char = buffer[pos - offset]
+
+            taken = False
+            resolved = False
+            alive = []
+            for parse in parses:
+                structural = not parse.in_string
+                if parse.step(char, pos) == _OPEN:
+                    alive.append(parse)
+                    taken = taken or structural
+                else:
+                    resolved = True
+                    self._pending.extend(parse.tool_calls)
+            if char == "{" and not taken:
+                alive.append(_ObjectParse(self, pos))
+            self._parses = alive
+            pos += 1
+            if resolved and self._pending:
+                tool_calls.extend(self._flush())
+
+        # 只保留最早的未闭合对象之后的文本
+        self._pos = pos
+        keep = self._parses[0].root if self._parses else pos
+        self._text = self._text[keep - self._offset :]
+        self._offset = keep
+        return tool_calls
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """结束输入，仍未闭合的对象都视为普通文本
+
+        Returns:
+            剩余的工具调用
+        """
+        for parse in self._parses:
+            self._pending.extend(parse.tool_calls)
+        self._parses = []
+        self._text = ""
+        self._offset = self._pos
+        return self._flush()
+
+    def _flush(self) -> List[Dict[str, Any]]:
+        """输出不会再被更早的未闭合对象包含的工具调用"""
+        tool_calls = []
+        while self._pending:
+            self._pending.sort(key=lambda span: span[0])
+            start, end, tool_call = self._pending[0]
+            if self._parses and self._parses[0].root < start:
+                break
+            del self._pending[0]
+            if start < self._end:
+                continue
+            tool_calls.append(tool_call)
+            self._end = end
+            self._drop_before(end)
+        return tool_calls
+
+    def _drop_before(self, end: int) -> None:
+        """已输出的工具调用之前开始的解析只保留其后开始的对象"""
+        parses = []
+        for parse in self._parses:
+            if parse.root < end:
+                is_open, released = parse.drop_before(end)
+                self._pending.extend(released)
+                if not is_open:
+                    continue
+            parses.append(parse)
+        parses.sort(key=lambda parse: parse.root)
+        self._parses = parses
+
+
+def _scan_tool_calls(text: str) -> List[Dict[str, Any]]:
+    """扫描完整文本中的所有工具调用
+
+    Args:
+        text: 待扫描的文本
+
+    Returns:
+        工具调用列表
+    """
+    scanner = _ToolCallScanner()
+    return scanner.feed(text) + scanner.finish()
+
 
 @dataclass
 class ToolCall:
@@ -45,6 +367,7 @@ class ToolCall:
     arguments: Dict[str, Any]
     result: Optional[Any] = None
     error: Optional[str] = None
+    arguments_json: str = ""
 
     def is_successful(self) -> bool:
         """检查工具调用是否成功"""
@@ -65,14 +388,47 @@ class ChatSession:
         self.llm_client: OllamaClient = llm_client
         self.messages: List[Dict[str, str]] = []
         self._is_initialized: bool = False
+        self._tools_by_name: Dict[str, MCPTool] = {}
+        self._tools_description: Optional[str] = None
+        self._system_message: Optional[str] = None
+        self._response_cache: ResponseCache = ResponseCache()
 
-    async def cleanup_clients(self) -> None:
-        """清理所有客户端资源"""
-        for client in self.clients:
-            try:
-                await client.cleanup()
-            except Exception as e:
-                logging.warning(f"清理客户端 {client.name} 时警告: {e}")
+    async def cleanup_clients(self, timeout: float = 5.0) -> None:
+        """并发清理所有客户端资源
+
+        MCPClient.cleanup 内部由 _cleanup_lock 串行化，并发调用是安全的。
+
+        Args:
+            timeout: 单个客户端的清理超时时间（秒）
+        """
+        results = await asyncio.gather(
+            *(asyncio.wait_for(client.cleanup(), timeout=timeout) for client in self.clients),
+            return_exceptions=True,
+        )
+        for client, result in zip(self.clients, results):
+            if isinstance(result, asyncio.TimeoutError):
+                logging.warning(f"清理客户端 {client.name} 超时 ({timeout} 秒)")
+            elif isinstance(result, BaseException):
+                logging.warning(f"清理客户端 {client.name} 时警告: {result}")
+
+    def invalidate_tools_cache(self) -> None:
+        """使工具缓存失效，下次初始化时重新获取工具列表并重建系统消息"""
+        self._tools_by_name = {}
+        self._tools_description = None
+        self._system_message = None
+
+    @staticmethod
+    async def _initialize_client(client: MCPClient) -> List[MCPTool]:
+        """初始化单个 MCP 客户端并列出其工具
+
+        Args:
+            client: MCP 客户端
+
+        Returns:
+            该客户端提供的工具列表
+        """
+        await client.initialize()
+        return await client.list_tools()
 
     async def initialize(self) -> bool:
         """初始化 MCP 客户端并准备系统消息
@@ -81,38 +437,52 @@ class ChatSession:
             初始化是否成功
         """
         try:
-            if self._is_initialized:
+            if self._is_initialized and self._system_message is not None:
                 return True
 
-            # 初始化所有 MCP 客户端
+            if not self._is_initialized:
+                # 并发初始化所有 MCP 客户端，并在同一轮中收集所有可用工具
+                results = await asyncio.gather(
+                    *(self._initialize_client(client) for client in self.clients),
+                    return_exceptions=True,
+                )
+            else:
+                # 工具缓存已失效，客户端已连接，只需重新列出工具
+                results = await asyncio.gather(
+                    *(client.list_tools() for client in self.clients),
+                    return_exceptions=True,
+                )
+
             self.tool_client_map = {}
-            for client in self.clients:
-                try:
-                    await client.initialize()
-                    tools = await client.list_tools()
-                    for tool in tools:
-                        if tool.name in self.tool_client_map:
-                            logging.warning(
-                                f"工具 {tool.name} 已存在于 "
-                                f"{self.tool_client_map[tool.name].name}"
-                            )
-                        self.tool_client_map[tool.name] = client
-                except Exception as e:
-                    logging.error(f"初始化客户端失败: {e}")
-                    await self.cleanup_clients()
-                    return False
-
-            # 收集所有可用工具
-            all_tools = []
-            for client in self.clients:
-                tools = await client.list_tools()
-                all_tools.extend(tools)
-
-            # 格式化工具描述并创建系统消息
-            tools_description = "\n".join([tool.format_for_llm() for tool in all_tools])
-            system_message = SYSTEM_MESSAGE.format(tools_description=tools_description)
-
-            self.messages = [{"role": "system", "content": system_message}]
+            self._tools_by_name = {}
+            for client, result in zip(self.clients, results):
+                if isinstance(result, BaseException):
+                    # 单个客户端失败时跳过，不影响其他客户端
+                    logging.error(f"初始化客户端 {client.name} 失败: {result}")
+                    continue
+                for tool in result:
+                    if tool.name in self.tool_client_map:
+                        logging.warning(
+                            f"工具 {tool.name} 已存在于 "
+                            f"{self.tool_client_map[tool.name].name}"
+                        )
+                    self.tool_client_map[tool.name] = client
+                    self._tools_by_name[tool.name] = tool
+
+            # 格式化工具描述并创建系统消息，结果缓存到工具列表变化为止
+            self._tools_description = "\n".join(
+                [tool.format_for_llm() for tool in self._tools_by_name.values()]
+            )
+            self._system_message = (
+                _SYSTEM_MESSAGE_PREFIX + self._tools_description + _SYSTEM_MESSAGE_SUFFIX
+            )
+
+            system_message = {"role": "system", "content": self._system_message}
+            if self._is_initialized and self.messages:
+                # 刷新工具时保留已有的对话历史
+                self.messages[0] = system_message
+            else:
+                self.messages = [system_message]
             self._is_initialized = True
             return True
         except Exception as e:
@@ -129,36 +499,22 @@ class ChatSession:
         Returns:
             提取的工具调用列表
         """
-        # 尝试解析整个响应为 JSON
-        try:
-            tool_call = json.loads(llm_response)
-            if (
-                isinstance(tool_call, dict)
-                and "tool" in tool_call
-                and "arguments" in tool_call
-            ):
-                return [tool_call]
-        except json.JSONDecodeError:
-            pass
-
-        # 尝试从响应中提取所有 JSON 对象
-        tool_calls = []
-        json_pattern = r"({[^{}]*({[^{}]*})*[^{}]*})"
-        json_matches = re.finditer(json_pattern, llm_response)
-
-        for match in json_matches:
-            try:
-                json_obj = json.loads(match.group(0))
-                if (
-                    isinstance(json_obj, dict)
-                    and "tool" in json_obj
-                    and "arguments" in json_obj
-                ):
-                    tool_calls.append(json_obj)
-            except json.JSONDecodeError:
-                continue
+        # 不含花括号的响应不可能包含工具调用
+        if "{" not in llm_response:
+            return []
+
+        # 去掉 Markdown 代码块标记后，尝试解析整个响应为 JSON
+        stripped = llm_response.strip()
+        if stripped.startswith("```"):
+            stripped = (
+                stripped.removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+            )
+        tool_call = _parse_tool_call(stripped)
+        if tool_call is not None:
+            return [tool_call]
 
-        return tool_calls
+        # 尝试从响应中提取所有工具调用 JSON 对象
+        return _scan_tool_calls(llm_response)
 
     async def _execute_tool_call(self, tool_call_data: Dict[str, Any]) -> ToolCall:
         """执行单个工具调用
@@ -172,11 +528,20 @@ class ChatSession:
         tool_name = tool_call_data["tool"]
         arguments = tool_call_data["arguments"]
 
-        tool_call = ToolCall(tool=tool_name, arguments=arguments)
+        # 参数只序列化一次，后续拼接工具结果时直接复用
+        tool_call = ToolCall(
+            tool=tool_name,
+            arguments=arguments,
+            arguments_json=orjson.dumps(arguments, option=orjson.OPT_NON_STR_KEYS).decode(),
+        )
         
-        # 显示工具调用信息
-
-        args_str = json.dumps(arguments, ensure_ascii=False, indent=2)
+        # 显示工具调用信息，仅在交互式终端中格式化带缩进的版本
+        if sys.stdout.isatty():
+            args_str = orjson.dumps(
+                arguments, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+            ).decode()
+        else:
+            args_str = tool_call.arguments_json
         print(f"\n🔧 调用工具: {tool_name}")
         print(f"📝 参数: {args_str}")
 
@@ -186,18 +551,18 @@ class ChatSession:
             try:
                 result = await client.execute_tool(tool_name, arguments)
                 tool_call.result = result
-                print(f"✅ 执行成功\n")
+                print(f"✅ {tool_name} 执行成功\n")
                 return tool_call
             except Exception as e:
                 error_msg = f"执行工具时出错: {str(e)}"
                 logging.error(error_msg)
                 tool_call.error = error_msg
-                print(f"❌ 执行失败: {error_msg}\n")
+                print(f"❌ {tool_name} 执行失败: {error_msg}\n")
                 return tool_call
 
         # 未找到可执行此工具的客户端
         tool_call.error = f"未找到工具: {tool_name}"
-        print(f"❌ 未找到工具\n")
+        print(f"❌ 未找到工具: {tool_name}\n")
         return tool_call
 
     async def process_tool_calls(self, llm_response: str) -> Tuple[List[ToolCall], bool]:
@@ -214,13 +579,68 @@ class ChatSession:
         if not tool_call_data_list:
             return [], False
         
-        tool_calls = []
-        for tool_call_data in tool_call_data_list:
-            tool_call = await self._execute_tool_call(tool_call_data)
-            tool_calls.append(tool_call)
-        
+        tool_calls = await self._execute_tool_call_data_list(tool_call_data_list)
         return tool_calls, True
 
+    async def _execute_tool_call_data_list(
+        self, tool_call_data_list: List[Dict[str, Any]]
+    ) -> List[ToolCall]:
+        """执行已解析的工具调用列表
+        
+        Args:
+            tool_call_data_list: 工具调用数据列表
+            
+        Returns:
+            工具调用结果列表
+        """
+        # 并发执行相互独立的工具调用，_execute_tool_call 内部已捕获异常
+        tool_calls = await asyncio.gather(
+            *(self._execute_tool_call(tool_call_data) for tool_call_data in tool_call_data_list)
+        )
+        return list(tool_calls)
+
+    async def _stream_llm_response(self) -> str:
+        """流式获取 LLM 响应并实时输出
+
+        一旦流中出现完整的工具调用 JSON 对象，立即停止接收剩余内容。
+
+        Returns:
+            LLM 响应文本
+        """
+        buffer = io.StringIO()
+        scanner = _ToolCallScanner()
+
+        async with aclosing(self.llm_client.get_stream_response(self.messages)) as stream:
+            async for chunk in stream:
+                buffer.write(chunk)
+                print(chunk, end="", flush=True)
+                if scanner.feed(chunk):
+                    break
+
+        print()
+        return buffer.getvalue()
+
+    async def _get_llm_response(self) -> str:
+        """获取 LLM 对当前消息历史的响应
+
+        仅在 temperature 为 0（输出确定）时使用缓存。
+
+        Returns:
+            LLM 响应文本
+        """
+        if self.llm_client.temperature != 0:
+            return await self._stream_llm_response()
+
+        cache_key = ResponseCache.make_key(self.llm_client.model_name, self.messages)
+        llm_response = self._response_cache.get(cache_key)
+        if llm_response is not None:
+            print(llm_response)
+            return llm_response
+
+        llm_response = await self._stream_llm_response()
+        self._response_cache.set(cache_key, llm_response)
+        return llm_response
+
     async def send_message(self, user_message: str, max_iterations: int = 5) -> str:
         """发送消息并获取响应，自动处理工具调用迭代
         
@@ -231,7 +651,7 @@ class ChatSession:
         Returns:
             最终响应文本
         """
-        if not self._is_initialized:
+        if not self._is_initialized or self._system_message is None:
             success = await self.initialize()
             if not success:
                 return "初始化聊天会话失败"
@@ -240,50 +660,50 @@ class ChatSession:
         self.messages.append({"role": "user", "content": user_message})
 
         # 获取初始 LLM 响应
-        llm_response = self.llm_client.get_response(self.messages)
+        llm_response = await self._get_llm_response()
         self.messages.append({"role": "assistant", "content": llm_response})
 
+        # 每个响应只解析一次工具调用，没有工具调用时直接返回该响应
+        tool_call_data_list = self._extract_tool_calls(llm_response)
+
         # 自动处理工具调用迭代
         tool_iteration = 0
-        while tool_iteration < max_iterations:
+        while tool_call_data_list:
+            if tool_iteration >= max_iterations:
+                # 达到最大迭代次数
+                logging.warning(f"达到最大工具调用迭代次数 ({max_iterations})")
+                break
             tool_iteration += 1
             
-            # 处理工具调用
-            tool_calls, has_tools = await self.process_tool_calls(llm_response)
-            
-            if not has_tools:
-                # 没有工具调用，返回最终响应
-                return llm_response
+            # 执行工具调用
+            tool_calls = await self._execute_tool_call_data_list(tool_call_data_list)
             
             # 格式化工具结果
             tool_results = "\n\n".join(
                 [
-                    f"工具: {tc.tool}\n参数: {json.dumps(tc.arguments, ensure_ascii=False)}\n"
+                    f"工具: {tc.tool}\n参数: {tc.arguments_json}\n"
                     f"结果: {tc.result if tc.is_successful() else tc.error}"
                     for tc in tool_calls
                 ]
             )
             
-            # 将工具结果添加到消息历史
-            self.messages.append({"role": "system", "content": f"工具执行结果:\n\n{tool_results}"})
+            # 将工具结果以用户消息添加到消息历史，保持系统消息前缀稳定以命中提示词缓存
+            self.messages.append({"role": "user", "content": f"工具执行结果:\n\n{tool_results}"})
             
             # 获取下一个 LLM 响应
-            llm_response = self.llm_client.get_response(self.messages)
+            llm_response = await self._get_llm_response()
             self.messages.append({"role": "assistant", "content": llm_response})
             
             # 检查下一个响应是否还包含工具调用
-            next_tool_calls = self._extract_tool_calls(llm_response)
-            if not next_tool_calls:
-                # 没有更多工具调用，返回最终响应
-                return llm_response
+            tool_call_data_list = self._extract_tool_calls(llm_response)
         
-        # 达到最大迭代次数
-        logging.warning(f"达到最大工具调用迭代次数 ({max_iterations})")
         return llm_response
 
     def clear_history(self) -> None:
         """清空对话历史"""
-        if self._is_initialized and self.messages:
+        if self._system_message is not None:
             # 保留系统消息
-            system_message = self.messages[0]
-            self.messages = [system_message]
+            self.messages = [{"role": "system", "content": self._system_message}]
+        else:
+            # 工具缓存已失效时只保留旧的系统消息，由 initialize() 重建
+            self.messages = self.messages[:1]
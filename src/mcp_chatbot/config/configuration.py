@@ -1,6 +1,7 @@
 """配置管理"""
 
 import json
+import logging
 import os
 from typing import Any, Optional
 
@@ -15,6 +16,7 @@ class Configuration:
         self.load_env()
         self._ollama_model_name = os.getenv("OLLAMA_MODEL_NAME")
         self._ollama_base_url = os.getenv("OLLAMA_BASE_URL")
+        self._llm_temperature = os.getenv("LLM_TEMPERATURE")
 
     @staticmethod
     def load_env() -> None:
@@ -47,3 +49,16 @@ class Configuration:
         if not self._ollama_base_url:
             return "http://localhost:11434"
         return self._ollama_base_url
+
+    @property
+    def llm_temperature(self) -> Optional[float]:
+        """获取 LLM 采样温度，未设置时使用模型默认值"""
+        if not self._llm_temperature:
+            return None
+        try:
+            return float(self._llm_temperature)
+        except ValueError:
+            logging.warning(
+                f"LLM_TEMPERATURE 无效: {self._llm_temperature!r}，使用模型默认值"
+            )
+            return None
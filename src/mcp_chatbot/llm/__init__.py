@@ -1,6 +1,7 @@
 """LLM 客户端模块"""
 
+from .cache import ResponseCache
 from .ollama import OllamaClient
 from .siliconflow import SiliconFlowClient
 
-__all__ = ["OllamaClient", "SiliconFlowClient"]
+__all__ = ["OllamaClient", "ResponseCache", "SiliconFlowClient"]
@@ -0,0 +1,73 @@
+"""LLM 响应缓存"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+
+import orjson
+
+
+class ResponseCache:
+    """LLM 响应的 LRU 缓存
+
+    只应在输出确定（temperature == 0）时使用，否则会把一次采样结果固定下来。
+    """
+
+    def __init__(self, max_size: int = 128) -> None:
+        """初始化缓存
+
+        Args:
+            max_size: 最大缓存条目数
+        """
+        self.max_size: int = max_size
+        self._entries: OrderedDict[str, str] = OrderedDict()
+
+    @staticmethod
+    def make_key(model_name: str, messages: list[dict[str, str]]) -> str:
+        """根据模型名称和消息列表生成缓存键
+
+        Args:
+            model_name: 模型名称
+            messages: 消息列表
+
+        Returns:
+            缓存键
+        """
+        payload = orjson.dumps(
+            {"model": model_name, "messages": messages},
+            option=orjson.OPT_SORT_KEYS,
+        )
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """获取缓存的响应
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的响应，未命中时为 None
+        """
+        response = self._entries.get(key)
+        if response is not None:
+            self._entries.move_to_end(key)
+        return response
+
+    def set(self, key: str, response: str) -> None:
+        """写入缓存，超出容量时淘汰最久未使用的条目
+
+        Args:
+            key: 缓存键
+            response: LLM 响应
+        """
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,12 +1,15 @@
 """Ollama LLM 客户端"""
 
 import os
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-import dotenv
-import requests
+import httpx
+import orjson
 
-dotenv.load_dotenv()
+from .stream import aiter_byte_lines
+
+# 流式响应结束标记
+_DONE_LINE = b'{"done":true}'
 
 
 class OllamaClient:
@@ -16,11 +19,42 @@ class OllamaClient:
         self,
         model_name: Optional[str] = None,
         api_base: Optional[str] = None,
+        temperature: Optional[float] = None,
     ):
         self.model_name = model_name or os.getenv("OLLAMA_MODEL_NAME", "gemma:2b")
         self.api_base = api_base or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+        self.temperature = temperature
+        # 复用连接池中的长连接，避免每轮对话重新建立连接
+        self._client = httpx.AsyncClient(
+            timeout=120,
+            headers={"Content-Type": "application/json"},
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+        )
+
+    async def aclose(self) -> None:
+        """关闭 HTTP 客户端"""
+        await self._client.aclose()
+
+    def _build_payload(self, messages: list[dict[str, str]], stream: bool) -> dict:
+        """构建请求体
+
+        Args:
+            messages: 消息列表
+            stream: 是否流式返回
+
+        Returns:
+            请求体
+        """
+        payload = {
+            "model": self.model_name,
+            "messages": messages,
+            "stream": stream,
+        }
+        if self.temperature is not None:
+            payload["options"] = {"temperature": self.temperature}
+        return payload
 
-    def get_response(self, messages: list[dict[str, str]]) -> str:
+    async def get_response(self, messages: list[dict[str, str]]) -> str:
         """获取 LLM 响应
         
         Args:
@@ -29,18 +63,16 @@ class OllamaClient:
         Returns:
             LLM 响应内容
         """
-        response = requests.post(
+        response = await self._client.post(
             f"{self.api_base}/api/chat",
-            json={
-                "model": self.model_name,
-                "messages": messages,
-                "stream": False,
-            },
+            content=orjson.dumps(self._build_payload(messages, stream=False)),
         )
         response.raise_for_status()
-        return response.json()["message"]["content"]
+        return orjson.loads(response.content)["message"]["content"]
 
-    def get_stream_response(self, messages: list[dict[str, str]]):
+    async def get_stream_response(
+        self, messages: list[dict[str, str]]
+    ) -> AsyncIterator[str]:
         """获取流式 LLM 响应
         
         Args:
@@ -49,29 +81,25 @@ class OllamaClient:
         Yields:
             响应片段
         """
-        response = requests.post(
+        async with self._client.stream(
+            "POST",
             f"{self.api_base}/api/chat",
-            json={
-                "model": self.model_name,
-                "messages": messages,
-                "stream": True,
-            },
-            stream=True,
-        )
-        response.raise_for_status()
+            content=orjson.dumps(self._build_payload(messages, stream=True)),
+        ) as response:
+            response.raise_for_status()
 
-        for line in response.iter_lines():
-            if line:
-                data = line.decode("utf-8")
-                if data == '{"done":true}':
+            # 绑定为局部变量，避免逐块的属性查找
+            loads = orjson.loads
+            decode_error = orjson.JSONDecodeError
+            async for data in aiter_byte_lines(response):
+                if not data or data == _DONE_LINE:
                     continue
 
-                import json
                 try:
-                    chunk = json.loads(data)
+                    chunk = loads(data)
                     if "message" in chunk and "content" in chunk["message"]:
                         content = chunk["message"]["content"]
                         if content:
                             yield content
-                except json.JSONDecodeError:
+                except decode_error:
                     continue
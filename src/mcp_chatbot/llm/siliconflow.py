@@ -1,12 +1,17 @@
 """硅基流动 LLM 客户端"""
 
 import os
-from typing import Optional
+from typing import Any, AsyncIterator, Optional
 
-import dotenv
-import requests
+import httpx
+import orjson
 
-dotenv.load_dotenv()
+from .stream import aiter_byte_lines
+
+# SSE 数据行前缀及结束标记
+_DATA_PREFIX = b"data: "
+_DATA_PREFIX_LEN = len(_DATA_PREFIX)
+_DONE_MARKER = b"[DONE]"
 
 
 class SiliconFlowClient:
@@ -17,15 +22,85 @@ class SiliconFlowClient:
         model_name: Optional[str] = None,
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
+        temperature: Optional[float] = None,
+        cache_control: Optional[bool] = None,
     ):
         self.model_name = model_name or os.getenv("SILICONFLOW_MODEL_NAME", "Qwen/Qwen2.5-7B-Instruct")
         self.api_key = api_key or os.getenv("SILICONFLOW_API_KEY")
         self.base_url = base_url or os.getenv("SILICONFLOW_BASE_URL", "https://api.siliconflow.cn/v1")
+        self.temperature = temperature
+        # 未指定时，仅对需要显式缓存标记的 Anthropic (Claude) 模型启用
+        self.cache_control = (
+            cache_control if cache_control is not None else "claude" in self.model_name.lower()
+        )
         
         if not self.api_key:
             raise ValueError("SILICONFLOW_API_KEY not found in environment variables")
 
-    def get_response(self, messages: list[dict[str, str]]) -> str:
+        # 复用连接池中的长连接，避免每轮对话重新进行 TCP/TLS 握手
+        self._client = httpx.AsyncClient(
+            timeout=120,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+        )
+
+    async def aclose(self) -> None:
+        """关闭 HTTP 客户端"""
+        await self._client.aclose()
+
+    def _build_payload(self, messages: list[dict[str, str]], stream: bool) -> dict:
+        """构建请求体
+
+        Args:
+            messages: 消息列表
+            stream: 是否流式返回
+
+        Returns:
+            请求体
+        """
+        payload = {
+            "model": self.model_name,
+            "messages": self._with_cache_control(messages) if self.cache_control else messages,
+            "stream": stream,
+        }
+        if self.temperature is not None:
+            payload["temperature"] = self.temperature
+        return payload
+
+    @staticmethod
+    def _with_cache_control(messages: list[dict[str, str]]) -> list[dict[str, Any]]:
+        """为系统消息和最后一条用户消息添加提示词缓存标记
+
+        Args:
+            messages: 消息列表
+
+        Returns:
+            添加了 cache_control 标记的消息列表副本
+        """
+        last_user_index = max(
+            (i for i, message in enumerate(messages) if message["role"] == "user"),
+            default=None,
+        )
+        marked_messages = []
+        for i, message in enumerate(messages):
+            if (i == 0 and message["role"] == "system") or i == last_user_index:
+                message = {
+                    "role": message["role"],
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": message["content"],
+                            "cache_control": {"type": "ephemeral"},
+                        }
+                    ],
+                }
+            marked_messages.append(message)
+        return marked_messages
+
+    async def get_response(self, messages: list[dict[str, str]]) -> str:
         """获取 LLM 响应
         
         Args:
@@ -34,22 +109,16 @@ class SiliconFlowClient:
         Returns:
             LLM 响应内容
         """
-        response = requests.post(
+        response = await self._client.post(
             f"{self.base_url}/chat/completions",
-            headers={
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": self.model_name,
-                "messages": messages,
-                "stream": False,
-            },
+            content=orjson.dumps(self._build_payload(messages, stream=False)),
         )
         response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
+        return orjson.loads(response.content)["choices"][0]["message"]["content"]
 
-    def get_stream_response(self, messages: list[dict[str, str]]):
+    async def get_stream_response(
+        self, messages: list[dict[str, str]]
+    ) -> AsyncIterator[str]:
         """获取流式 LLM 响应
         
         Args:
@@ -58,37 +127,31 @@ class SiliconFlowClient:
         Yields:
             响应片段
         """
-        response = requests.post(
+        async with self._client.stream(
+            "POST",
             f"{self.base_url}/chat/completions",
-            headers={
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": self.model_name,
-                "messages": messages,
-                "stream": True,
-            },
-            stream=True,
-        )
-        response.raise_for_status()
+            content=orjson.dumps(self._build_payload(messages, stream=True)),
+        ) as response:
+            response.raise_for_status()
+
+            # 绑定为局部变量，避免逐块的属性查找
+            loads = orjson.loads
+            decode_error = orjson.JSONDecodeError
+            async for data in aiter_byte_lines(response):
+                if not data:
+                    continue
+                if data.startswith(_DATA_PREFIX):
+                    data = data[_DATA_PREFIX_LEN:]
 
-        for line in response.iter_lines():
-            if line:
-                data = line.decode("utf-8")
-                if data.startswith("data: "):
-                    data = data[6:]
-                    
-                if data.strip() == "[DONE]":
+                if data.strip() == _DONE_MARKER:
                     continue
 
-                import json
                 try:
-                    chunk = json.loads(data)
+                    chunk = loads(data)
                     if "choices" in chunk and len(chunk["choices"]) > 0:
                         delta = chunk["choices"][0].get("delta", {})
                         content = delta.get("content", "")
                         if content:
                             yield content
-                except json.JSONDecodeError:
+                except decode_error:
                     continue
@@ -0,0 +1,30 @@
+"""流式响应工具"""
+
+from typing import AsyncIterator
+
+import httpx
+
+
+async def aiter_byte_lines(response: httpx.Response) -> AsyncIterator[bytes]:
+    """按行迭代流式响应的原始字节
+
+    直接在字节缓冲区上按换行拆分，省去逐行解码为 str 的开销；
+    底层每次从连接读取最多 64 KiB，不会因凑满固定块大小而延迟输出。
+
+    Args:
+        response: 流式 HTTP 响应
+
+    Yields:
+        去掉行尾换行符的单行字节
+    """
+    buffer = bytearray()
+    async for data in response.aiter_bytes():
+        buffer += data
+        start = 0
+        while (end := buffer.find(b"\n", start)) != -1:
+            yield bytes(buffer[start:end]).rstrip(b"\r")
+            start = end + 1
+        del buffer[:start]
+
+    if buffer:
+        yield bytes(buffer).rstrip(b"\r")
@@ -7,11 +7,21 @@ import shutil
 from contextlib import AsyncExitStack
 from typing import Any, List
 
+import anyio
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
 from .mcp_tool import MCPTool
 
+# 可重试的传输层错误（超时、stdio 连接断开），其他错误重试也无济于事
+_TRANSIENT_ERRORS = (
+    asyncio.TimeoutError,
+    BrokenPipeError,
+    ConnectionResetError,
+    anyio.BrokenResourceError,
+    anyio.ClosedResourceError,
+)
+
 
 class MCPClient:
     """MCP 客户端，管理与 MCP 服务器的连接"""
@@ -22,6 +32,8 @@ class MCPClient:
         self.session: ClientSession | None = None
         self._cleanup_lock: asyncio.Lock = asyncio.Lock()
         self.exit_stack: AsyncExitStack = AsyncExitStack()
+        self._shutdown_event: asyncio.Event = asyncio.Event()
+        self._session_task: asyncio.Task | None = None
 
     async def initialize(self) -> None:
         """初始化服务器连接"""
@@ -40,21 +52,49 @@ class MCPClient:
             if self.config.get("env")
             else None,
         )
+        # 连接在独立任务中建立和关闭：stdio_client 内部的 anyio 任务组
+        # 要求在同一任务中进入和退出，这样 initialize/cleanup 可在任意任务中调用
+        ready: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._shutdown_event.clear()
+        self._session_task = asyncio.create_task(self._run_session(server_params, ready))
         try:
-            stdio_transport = await self.exit_stack.enter_async_context(
-                stdio_client(server_params)
-            )
-            read, write = stdio_transport
-            session = await self.exit_stack.enter_async_context(
-                ClientSession(read, write)
-            )
-            await session.initialize()
-            self.session = session
+            await ready
         except Exception as e:
             logging.error(f"初始化服务器 {self.name} 时出错: {e}")
             await self.cleanup()
             raise
 
+    async def _run_session(
+        self, server_params: StdioServerParameters, ready: asyncio.Future[None]
+    ) -> None:
+        """建立服务器连接并保持，直到收到关闭信号
+
+        Args:
+            server_params: stdio 服务器参数
+            ready: 连接建立完成（或失败）时设置的 Future
+        """
+        try:
+            async with self.exit_stack:
+                stdio_transport = await self.exit_stack.enter_async_context(
+                    stdio_client(server_params)
+                )
+                read, write = stdio_transport
+                session = await self.exit_stack.enter_async_context(
+                    ClientSession(read, write)
+                )
+                await session.initialize()
+                self.session = session
+                ready.set_result(None)
+                await self._shutdown_event.wait()
+        except Exception as e:
+            if ready.done():
+                raise
+            ready.set_exception(e)
+        finally:
+            self.session = None
+            if not ready.done():
+                ready.cancel()
+
     async def list_tools(self) -> List[MCPTool]:
         """列出可用工具
         
@@ -81,12 +121,14 @@ class MCPClient:
         delay: float = 1.0,
     ) -> Any:
         """执行工具
+
+        仅在传输层错误时重试，并使用指数退避；其他错误立即抛出。
         
         Args:
             tool_name: 工具名称
             arguments: 工具参数
             retries: 重试次数
-            delay: 重试延迟（秒）
+            delay: 首次重试延迟（秒），之后每次翻倍
             
         Returns:
             工具执行结果
@@ -101,14 +143,15 @@ class MCPClient:
                 result = await self.session.call_tool(tool_name, arguments)
                 return result
 
-            except Exception as e:
+            except _TRANSIENT_ERRORS as e:
                 attempt += 1
                 logging.warning(
-                    f"执行工具时出错: {e}. 尝试 {attempt}/{retries}."
+                    f"执行工具时出错: {e!r}. 尝试 {attempt}/{retries}."
                 )
                 if attempt < retries:
-                    logging.info(f"{delay} 秒后重试...")
-                    await asyncio.sleep(delay)
+                    backoff = delay * (2 ** (attempt - 1))
+                    logging.info(f"{backoff} 秒后重试...")
+                    await asyncio.sleep(backoff)
                 else:
                     logging.error("达到最大重试次数")
                     raise
@@ -116,11 +159,17 @@ class MCPClient:
     async def cleanup(self) -> None:
         """清理资源"""
         async with self._cleanup_lock:
+            if self._session_task is None:
+                return
+            self._shutdown_event.set()
             try:
-                await self.exit_stack.aclose()
-                self.session = None
+                await self._session_task
             except Exception as e:
                 logging.error(f"清理服务器 {self.name} 时出错: {e}")
+            finally:
+                self._session_task = None
+                self.session = None
+                self.exit_stack = AsyncExitStack()
 
     async def __aenter__(self):
         """进入异步上下文"""
@@ -0,0 +1,7 @@
+"""测试配置"""
+
+import os
+import sys
+
+# 与 src/main.py 一致，将 src 目录加入路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
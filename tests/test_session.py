@@ -0,0 +1,79 @@
+"""ChatSession 工具调用提取测试"""
+
+import time
+
+import pytest
+
+from mcp_chatbot.chat.session import ChatSession, _ToolCallScanner
+
+TOOL_CALL = '{"tool": "a", "arguments": {"p": "x"}}'
+EXPECTED = [{"tool": "a", "arguments": {"p": "x"}}]
+
+
+def _extract(llm_response: str) -> list:
+    return ChatSession([], None)._extract_tool_calls(llm_response)
+
+
+def test_extract_plain_json() -> None:
+    assert _extract(TOOL_CALL) == EXPECTED
+
+
+def test_extract_fenced_json() -> None:
+    assert _extract(f"```json\n{TOOL_CALL}\n```") == EXPECTED
+
+
+def test_extract_deeply_nested_arguments() -> None:
+    response = 'ok {"tool": "a", "arguments": {"b": {"c": {"d": "}{\\""}}}} done'
+    assert _extract(response) == [{"tool": "a", "arguments": {"b": {"c": {"d": '}{"'}}}}]
+
+
+def test_extract_multiple_tool_calls() -> None:
+    response = f'{TOOL_CALL} and {{"tool": "b", "arguments": {{}}}}'
+    assert _extract(response) == EXPECTED + [{"tool": "b", "arguments": {}}]
+
+
+def test_extract_skips_non_tool_json() -> None:
+    assert _extract('{"a": 1} then ' + TOOL_CALL) == EXPECTED
+
+
+def test_extract_after_unbalanced_brace() -> None:
+    assert _extract(f"Use {{ to open a block. {TOOL_CALL}") == EXPECTED
+
+
+def test_extract_after_brace_inside_quoted_prose() -> None:
+    assert _extract(f'he said "hi {{" then {TOOL_CALL}') == EXPECTED
+
+
+def test_extract_tool_call_nested_in_non_tool_json() -> None:
+    assert _extract(f'{{"result": {TOOL_CALL}}}') == EXPECTED
+
+
+def test_extract_without_tool_call() -> None:
+    assert _extract("你好 { 世界") == []
+
+
+def test_scanner_detects_tool_call_across_chunks() -> None:
+    scanner = _ToolCallScanner()
+    response = f"Use {{ to open a block. {TOOL_CALL} trailing text"
+    found = []
+    for i, char in enumerate(response):
+        found = scanner.feed(char)
+        if found:
+            break
+    assert found == EXPECTED
+    assert response[: i + 1].endswith(TOOL_CALL)
+
+
+@pytest.mark.parametrize(
+    "prefix",
+    [
+        '{"a' * 16000,
+        '{"a": ' * 16000,
+        '{"a":' * 2000 + "1" + "}" * 2000,
+    ],
+    ids=["unclosed-keys", "unclosed-objects", "nested-non-tool"],
+)
+def test_extract_is_linear_in_response_size(prefix: str) -> None:
+    start = time.perf_counter()
+    assert _extract(prefix + TOOL_CALL) == EXPECTED
+    assert time.perf_counter() - start < 1.0